@@ -3,91 +3,330 @@
 auto_crack.py
 
 Usage:
-    auto_crack.py <hash_file> <wordlist>
+    auto_crack.py [-j JOBS] [--multi-gpu N] [--auto-detect]
+                  [--no-optimize] [--workload {1,2,3,4}] <hash_file> <wordlist>
 
 What it does:
-• Maintains per-<hash,mode_id> tracking in crack_log.json to avoid redundant cracking.
-• Reads all valid hashes from <hash_file> (ignores empty lines and comments).
+• Maintains per-<hash,mode_id> tracking in crack_log.db (SQLite, keyed on
+  (hash, mode_id)) to avoid redundant cracking.
+• Reads all valid hashes from <hash_file> (ignores empty lines, comments and duplicates).
 • Uses `hashcat --show <hash_file>` to enumerate structurally compatible hash modes.
-• For each candidate mode:
+• With --auto-detect (hashcat >= 6.2.1), first runs hashcat without -m: if only
+  one mode matches, hashcat attacks it directly and that's the whole run;
+  otherwise the modes it lists become the candidates.
+• With -O on (the default), skips modes whose optimized-kernel password
+  length cap is shorter than every word in <wordlist>.
+• For each candidate mode (up to --jobs modes run concurrently):
     – Filters out hashes already attempted with this mode (via log).
-    – Writes remaining hashes to a temporary subset file.
-    – Creates a mode-specific temp potfile and runs Hashcat with:
-        hashcat -m <mode> -a 0 --quiet --potfile-path <pot> <subset_file> <wordlist>
-    – If exit code == 0, reruns Hashcat with `--show` to get cracked results.
+    – Writes remaining hashes to a temporary subset file, sorted so equal
+      salts/lengths sit next to each other.
+    – Reuses a persistent per-mode potfile (.autocrack_pots/<mode>.pot), seeded
+      from the log, so hashcat skips anything it already knows, and runs:
+        hashcat -m <mode> -a 0 --quiet -O -w 3 --potfile-path <pot> <subset_file> <wordlist>
+      (-O / -w are controlled by --no-optimize / --workload)
+    – If exit code == 0, reads the newly appended potfile lines directly
+      (only falls back to `hashcat --show` for lines it can't map to a hash).
         • Prints “[FOUND]” and the <hash> → '<clear>' for each.
         • Logs each cracked result with mode, cleartext, and UTC timestamp.
     – If nothing was cracked, prints “[NOT FOUND]”.
-    – Cleans up temporary potfile and subset file after each mode.
+    – Cleans up the temporary subset file after each mode.
+    (Subset files are prepared one mode ahead and removed by background
+    threads, so that host-side work overlaps with hashcat.)
+• With --multi-gpu N, mode attempts are sharded round-robin across devices
+  1..N via hashcat's `-d`.
 • At the end, prints a summary of all newly cracked hashes per mode.
 
 Example:
     ./auto_crack.py hashes.txt rockyou.txt
+    ./auto_crack.py -j 2 --multi-gpu 2 hashes.txt rockyou.txt
 """
 
+import argparse
 import subprocess
 import sys
 import os
-import re
 import tempfile
 import json
+import queue
+import sqlite3
+import stat
+import threading
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import cycle
 from datetime import datetime, timezone
 
-LOG_FILE = "crack_log.json"
+LOG_FILE = "crack_log.db"
+# Older log formats, imported once: the original JSON array and the JSONL log
+LEGACY_LOG_FILES = ("crack_log.json", "crack_log.jsonl")
+POT_DIR  = ".autocrack_pots"
+AUTODETECT_MIN_VERSION = (6, 2, 1)
+
+# Max password length hashcat's optimized (-O) kernels accept, per mode.
+# Modes not listed are assumed not to be capped below any realistic word.
+MODE_MAX_LEN_OPTIMIZED = {
+    "0":    31,  # MD5
+    "10":   31,  # md5($pass.$salt)
+    "20":   31,  # md5($salt.$pass)
+    "100":  31,  # SHA1
+    "900":  31,  # MD4
+    "1000": 27,  # NTLM
+    "1400": 31,  # SHA2-256
+    "1700": 31,  # SHA2-512
+    "500":  15,  # md5crypt
+    "1500": 8,   # descrypt
+    "1800": 15,  # sha512crypt
+    "3000": 7,   # LM
+    "7400": 15,  # sha256crypt
+}
 
 def validate_args():
-    if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} <hash_file> <wordlist>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Run hashcat across every structurally matching hash mode."
+    )
+    parser.add_argument("hash_file")
+    parser.add_argument("wordlist")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of modes to attempt concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--multi-gpu", type=int, default=0, metavar="N",
+        help="shard mode attempts round-robin across hashcat devices 1..N"
+    )
+    parser.add_argument(
+        "--auto-detect", action="store_true",
+        help="let hashcat (>= 6.2.1) pick the mode itself; one launch if the hash is unambiguous"
+    )
+    parser.add_argument(
+        "--no-optimize", dest="optimize", action="store_false",
+        help="don't pass -O. Optimized kernels are much faster but cap password "
+             "length (often 31 chars, less for some modes), so longer wordlist "
+             "entries are silently skipped"
+    )
+    parser.add_argument(
+        "--workload", type=int, choices=(1, 2, 3, 4), default=3,
+        help="hashcat workload profile passed as -w (default: 3, high; 4 makes the desktop unresponsive)"
+    )
+    args = parser.parse_args()
 
-    hash_file = sys.argv[1]
-    wordlist  = sys.argv[2]
+    if args.jobs < 1:
+        parser.error("--jobs must be >= 1")
+    if args.multi_gpu < 0:
+        parser.error("--multi-gpu must be >= 0")
 
-    if not os.path.isfile(hash_file) or os.path.getsize(hash_file) == 0:
-        print(f"Error: Hash file '{hash_file}' does not exist or is empty.")
+    if not is_nonempty_file(args.hash_file):
+        print(f"Error: Hash file '{args.hash_file}' does not exist or is empty.")
         sys.exit(1)
 
-    if not os.path.isfile(wordlist) or os.path.getsize(wordlist) == 0:
-        print(f"Error: Wordlist '{wordlist}' does not exist or is empty.")
+    if not is_nonempty_file(args.wordlist):
+        print(f"Error: Wordlist '{args.wordlist}' does not exist or is empty.")
         sys.exit(1)
 
-    return hash_file, wordlist
+    return args
+
+def is_nonempty_file(path):
+    """
+    True if <path> is a regular, non-empty file. One stat() call instead of
+    isfile() + getsize(), which matters on NFS/SMB shares.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and st.st_size > 0
+
+def bcrypt_key(h):
+    """
+    $2b$12$<22-char salt><31-char hash> -> group by cost + salt.
+    """
+    return (h[:29], h)
+
+def crypt_salt_key(h):
+    """
+    Modular crypt ($id$[rounds=N$]salt$hash) -> group by everything before the last '$'.
+    """
+    return (h.rsplit("$", 1)[0], h)
+
+def length_key(h):
+    return (len(h), h)
 
-def load_log_entries():
+# Modes whose hashes embed a salt we can group on; everything else is length-sorted.
+SORT_KEYS_BY_MODE = {
+    "3200": bcrypt_key,      # bcrypt $2*$
+    "500":  crypt_salt_key,  # md5crypt $1$
+    "1800": crypt_salt_key,  # sha512crypt $6$
+    "7400": crypt_salt_key,  # sha256crypt $5$
+}
+
+def db_text(s):
+    """
+    sqlite3 can't encode the surrogates get_all_hashes() keeps for bytes that
+    aren't valid UTF-8; store such strings as their original bytes instead.
     """
-    Load existing log entries from crack_log.json, each entry is
+    try:
+        s.encode("utf-8")
+        return s
+    except UnicodeEncodeError:
+        return s.encode("utf-8", "surrogateescape")
+
+def from_db_text(value):
+    """
+    Inverse of db_text().
+    """
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "surrogateescape")
+    return value
+
+def read_legacy_log(path):
+    """
+    Read the entries of an old log: a JSON array (crack_log.json) or one JSON
+    object per line (crack_log.jsonl), each
     { "hash": ..., "mode_id": ..., "clear": ..., "timestamp": ... }.
-    Returns a set of (hash, mode_id) tuples, and the full list for appending.
     """
-    if os.path.isfile(LOG_FILE):
+    with open(path, "r") as f:
+        if not path.endswith(".jsonl"):
+            return json.load(f)
+        entries = []
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # skip blank or torn/partial lines
+                continue
+        return entries
+
+def import_legacy_log(conn):
+    """
+    One-time import of any old crack_log.json / crack_log.jsonl into the
+    database. Each file is renamed to *.imported afterwards so it isn't
+    re-read on every run.
+    """
+    for path in LEGACY_LOG_FILES:
+        if not os.path.isfile(path):
+            continue
+
         try:
-            with open(LOG_FILE, "r") as f:
-                data = json.load(f)
-                seen = {(entry["hash"], entry["mode_id"]) for entry in data}
-                return seen, data
-        except Exception:
-            pass
-    return set(), []
+            rows = [
+                (db_text(entry["hash"]), entry["mode_id"], db_text(entry.get("clear", "")), entry.get("timestamp", ""))
+                for entry in read_legacy_log(path)
+            ]
+        except (ValueError, TypeError, KeyError):
+            # Leave the file alone so nothing is lost; it just isn't used
+            print(f"Warning: couldn't parse '{path}', not importing it.")
+            continue
+
+        conn.executemany("INSERT OR IGNORE INTO cracks VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+        os.replace(path, path + ".imported")
+        print(f"→ Imported {len(rows)} entries from {path} into {LOG_FILE}")
+
+def open_log():
+    """
+    Open (creating if needed) the crack_log.db SQLite database.
+    WAL mode keeps readers and the single writer from blocking each other.
+    """
+    conn = sqlite3.connect(LOG_FILE)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cracks("
+        "hash TEXT, mode_id TEXT, clear TEXT, ts TEXT, PRIMARY KEY(hash, mode_id))"
+    )
+    import_legacy_log(conn)
+    return conn
+
+def load_log_entries(conn):
+    """
+    Load existing log entries from the cracks table.
+    Returns a dict mapping mode_id -> {hash: clear} for hashes already cracked
+    with that mode.
+    """
+    by_mode = defaultdict(dict)
+    for h, mode_id, clear in conn.execute("SELECT hash, mode_id, clear FROM cracks"):
+        by_mode[mode_id][from_db_text(h)] = from_db_text(clear)
+    return by_mode
 
-def append_log(entries_list, entry):
+def append_log(conn, entry):
     """
-    Append a single entry dict to entries_list and write out to LOG_FILE.
+    Insert a single entry dict into the cracks table (ignored if that
+    <hash, mode_id> is already there).
     """
-    entries_list.append(entry)
-    with open(LOG_FILE, "w") as f:
-        json.dump(entries_list, f, indent=2)
+    conn.execute(
+        "INSERT OR IGNORE INTO cracks VALUES (?, ?, ?, ?)",
+        (db_text(entry["hash"]), entry["mode_id"], db_text(entry["clear"]), entry["timestamp"])
+    )
+    conn.commit()
 
 def get_all_hashes(hash_file):
     """
-    Read all non-empty, non-comment lines from hash_file.
+    Read all non-empty, non-comment lines from hash_file, dropping duplicates.
+    The file is streamed in binary mode and deduplicated as it's read, so
+    only one copy of each unique hash is ever held; blank and comment lines
+    are dropped before being decoded. Bytes that aren't valid UTF-8 are kept
+    as surrogates, so writing with errors="surrogateescape" gives hashcat
+    back exactly the original line.
+    Returns (hashes, hash_set): hashes in first-seen order plus the same
+    values as a set for membership tests.
     """
+    seen = set()
     hashes = []
-    with open(hash_file, "r") as f:
+    with open(hash_file, "rb", buffering=1 << 20) as f:
         for line in f:
-            h = line.strip()
-            if h and not h.startswith("#"):
-                hashes.append(h)
-    return hashes
+            line = line.strip()
+            if not line or line.startswith(b"#"):
+                continue
+            h = line.decode("utf-8", "surrogateescape")
+            if h in seen:
+                continue
+            seen.add(h)
+            hashes.append(h)
+    return hashes, seen
+
+def parse_mode_line(line):
+    """
+    Parse one hashcat mode-table line, strictly "<digits> | <name> | <category>".
+    Returns (mode_id, mode_name), or None for anything else.
+    """
+    parts = line.split("|", 2)
+    if len(parts) != 3:
+        return None
+    mode_id = parts[0].strip()
+    if not mode_id.isdigit():
+        return None
+    return mode_id, parts[1].strip()
+
+def wordlist_min_len(wordlist, stop_at=0):
+    """
+    Return the length in bytes of the shortest word in <wordlist>.
+    Reads in large chunks, measured with min(map(len, ...)) so the per-word
+    work stays in C. Stops early once a word no longer than <stop_at> is
+    seen, since the caller can't learn anything more from the rest.
+    """
+    shortest = None
+    tail = b""
+    with open(wordlist, "rb") as f:
+        while True:
+            chunk = f.read(1 << 24)
+            if not chunk:
+                break
+            # CRLF lists: drop the \r with the \n (the pair may straddle chunks,
+            # hence joining the previous tail first)
+            data = tail + chunk
+            if b"\r" in data:
+                data = data.replace(b"\r\n", b"\n")
+            words = data.split(b"\n")
+            tail = words.pop()  # possibly incomplete last line
+            if not words:
+                continue
+            lo = min(map(len, words))
+            shortest = lo if shortest is None else min(shortest, lo)
+            if shortest <= stop_at:
+                return shortest
+
+    if tail:
+        n = len(tail.rstrip(b"\r"))
+        shortest = n if shortest is None else min(shortest, n)
+    return shortest or 0
 
 def get_candidate_modes(hash_file):
     """
@@ -99,50 +338,228 @@ def get_candidate_modes(hash_file):
     Returns a list of (mode_id, mode_name) tuples.
     """
     try:
-        proc = subprocess.run(
+        proc = subprocess.Popen(
             ["hashcat", "--show", hash_file],
-            capture_output=True,
-            text=True
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1 << 20
         )
     except FileNotFoundError:
         print("Error: `hashcat` not found in PATH.")
         sys.exit(1)
 
-    output = proc.stdout.splitlines()
+    # Parse line by line as hashcat prints, instead of buffering it all first
     candidate_modes = []
-    pattern = re.compile(r'^\s*(\d+)\s*\|\s*(.+?)\s*\|\s*(.+)$')
-
-    for line in output:
-        match = pattern.match(line)
-        if match:
-            mode_id   = match.group(1).strip()
-            mode_name = match.group(2).strip()
-            candidate_modes.append((mode_id, mode_name))
+    with proc.stdout:
+        for line in proc.stdout:
+            mode = parse_mode_line(line)
+            if mode:
+                candidate_modes.append(mode)
+    proc.wait()
 
     return candidate_modes
 
-def run_hashcat_with_pot(mode, subset_file, wordlist, potpath):
+def session_flag(name):
+    """
+    A --session unique to this hashcat run. Concurrent runs (--jobs) would
+    otherwise all use the default "hashcat" session, and hashcat refuses to
+    start while another instance of the same session is running.
+    """
+    return f"--session=autocrack_{name}_{os.getpid()}"
+
+def get_hashcat_version():
+    """
+    Runs: hashcat -V  (prints e.g. "v6.2.6" or "v6.2.6-851-g6716447df")
+    Returns the version as a tuple of ints, or () if it can't be determined.
+    """
+    try:
+        proc = subprocess.run(["hashcat", "-V"], capture_output=True, text=True)
+    except FileNotFoundError:
+        print("Error: `hashcat` not found in PATH.")
+        sys.exit(1)
+
+    raw = proc.stdout.strip().lstrip("v").split("-", 1)[0]
+    version = []
+    for part in raw.split("."):
+        if not part.isdigit():
+            break
+        version.append(int(part))
+    return tuple(version)
+
+def tuning_flags(optimize, workload):
+    """
+    Hashcat performance flags: -O (optimized kernels) and -w <workload>.
     """
-    Runs: hashcat -m <mode> -a 0 --quiet --potfile-path <potpath> <subset_file> <wordlist>
+    flags = ["-O"] if optimize else []
+    return flags + ["-w", str(workload)]
+
+def session_flags(name):
+    """
+    Own session (see session_flag) and no restore-file writes: autoCrack
+    never uses --restore, so keeping a restore file up to date is wasted I/O.
+    """
+    return [session_flag(name), "--restore-disable"]
+
+def run_hashcat_autodetect(hash_file, wordlist, potpath, *, optimize=True, workload=3):
+    """
+    Runs: hashcat -a 0 [-O] -w <workload> --session=… --restore-disable --potfile-path <potpath> <hash_file> <wordlist>
+    i.e. without -m, so hashcat autodetects the mode. It prints the matching
+    mode(s) in the same table format as --show; with exactly one match it goes
+    on to run the attack. No --quiet here: the single-match notice and the
+    final status block ("Hash.Mode........: 0 (MD5)") are how we learn which
+    mode was attacked.
+    Returns (modes, attacked_mode, ran): the listed (mode_id, mode_name)
+    tuples, the mode hashcat attacked (or None if it can't be told), and
+    whether hashcat exited like an attack did (exit code 0 or 1).
+    """
+    proc = subprocess.run(
+        ["hashcat", "-a", "0", *tuning_flags(optimize, workload),
+         *session_flags("auto"), "--potfile-path", potpath, hash_file, wordlist],
+        capture_output=True,
+        text=True
+    )
+    ran = proc.returncode in (0, 1)
+
+    modes = []
+    status_mode = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("Hash.Mode"):
+            # e.g. "Hash.Mode........: 0 (MD5)"
+            mode_id, _, mode_name = line.partition(":")[2].strip().partition(" ")
+            if mode_id.isdigit():
+                status_mode = (mode_id, mode_name.strip().strip("()"))
+            continue
+        mode = parse_mode_line(line)
+        if mode and mode not in modes:
+            modes.append(mode)
+
+    attacked_mode = status_mode
+    if attacked_mode is None and ran and len(modes) == 1:
+        attacked_mode = modes[0]
+    if attacked_mode is not None and not modes:
+        modes = [attacked_mode]
+    return modes, attacked_mode, ran
+
+def run_hashcat_with_pot(mode, subset_file, wordlist, potpath, device=None, *, optimize=True, workload=3):
+    """
+    Runs: hashcat -m <mode> -a 0 --quiet [-O] -w <workload> --session=… --restore-disable [-d <device>] --potfile-path <potpath> <subset_file> <wordlist>
     Returns True if exit-code == 0 (i.e. cracked ≥1 hash), else False.
     """
+    cmd = ["hashcat", "-m", mode, "-a", "0", "--quiet", *tuning_flags(optimize, workload), *session_flags(mode)]
+    if device is not None:
+        cmd += ["-d", str(device)]
+    cmd += ["--potfile-path", potpath, subset_file, wordlist]
     proc = subprocess.run(
-        ["hashcat", "-m", mode, "-a", "0", "--quiet", "--potfile-path", potpath, subset_file, wordlist],
+        cmd,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL
     )
     return (proc.returncode == 0)
 
+HEX_CHARS = frozenset("0123456789abcdefABCDEF")
+
+def pot_lookup(hashes):
+    """
+    Map the form a hash takes in a potfile back to the hash as given.
+    hashcat writes hex-only hashes (MD5, SHA1, NTLM, …) in lowercase, so an
+    uppercase input line only matches via its lowercased key.
+    """
+    lookup = {}
+    for h in hashes:
+        lookup[h] = h
+        if set(h) <= HEX_CHARS:
+            lookup.setdefault(h.lower(), h)
+    return lookup
+
+def mode_potfile(mode_id, logged):
+    """
+    Return the path of the persistent potfile for <mode_id>, creating it if
+    needed and seeding it with any <hash>:<clear> pairs from <logged> that it
+    doesn't already contain.
+    """
+    os.makedirs(POT_DIR, exist_ok=True)
+    potpath = os.path.join(POT_DIR, f"{mode_id}.pot")
+
+    existing = set()
+    if os.path.isfile(potpath):
+        with open(potpath, "r", errors="surrogateescape") as f:
+            existing = {line.rstrip("\n") for line in f}
+
+    missing = [f"{h}:{clear}" for h, clear in logged.items() if f"{h}:{clear}" not in existing]
+    with open(potpath, "a", errors="surrogateescape") as f:
+        for line in missing:
+            f.write(line + "\n")
+    return potpath
+
+def split_pot_line(line, lookup):
+    """
+    Split a potfile line into (hash, clear). Potfile lines are <hash>:<clear>,
+    but salted/structured hashes may contain ':' themselves, so the split point
+    is the first colon whose prefix is a key of <lookup> (see pot_lookup).
+    The returned hash is the one as submitted.
+    Returns None if no prefix matches.
+    """
+    idx = line.find(":")
+    while idx != -1 and line[:idx] not in lookup:
+        idx = line.find(":", idx + 1)
+    if idx == -1:
+        return None
+    return lookup[line[:idx]], line[idx + 1:]
+
+def read_cracked_from_pot(potpath, lookup, offset=0):
+    """
+    Parse <potpath> directly instead of relaunching hashcat with --show.
+    Only lines written after byte <offset> are considered, so entries left by
+    earlier runs in a reused potfile are ignored.
+    Returns (pairs, unmatched) where unmatched counts lines that couldn't be
+    mapped back to a pending hash (e.g. hashcat normalised it some other way).
+    """
+    pairs = []
+    unmatched = 0
+    with open(potpath, "r", errors="surrogateescape") as f:
+        f.seek(offset)
+        for line in f:
+            line = line.rstrip("\n")
+            if ":" not in line:
+                continue
+            pair = split_pot_line(line, lookup)
+            if pair is None:
+                unmatched += 1
+                continue
+            pairs.append(pair)
+    return pairs, unmatched
+
+def prefilter_with_pot(pending, potpath):
+    """
+    Partition <pending> against what <potpath> already knows, matching hex
+    hashes case-insensitively like hashcat does (see pot_lookup).
+    Returns (still_pending, already_known_pairs); still_pending keeps the
+    order of <pending>.
+    """
+    lookup = pot_lookup(pending)
+    known = {}
+    with open(potpath, "r", errors="surrogateescape") as f:
+        for line in f:
+            pair = split_pot_line(line.rstrip("\n"), lookup)
+            if pair is not None:
+                known.setdefault(pair[0], pair[1])
+
+    still_pending = [h for h in pending if h not in known]
+    return still_pending, list(known.items())
+
 def extract_cracked_from_pot(mode, subset_file, wordlist, potpath):
     """
-    After a successful run, call:
-        hashcat -m <mode> -a 0 --quiet --potfile-path <potpath> --show <subset_file> <wordlist>
+    Fallback for potfiles read_cracked_from_pot can't fully map. Calls:
+        hashcat -m <mode> -a 0 --quiet --session=… --potfile-path <potpath> --show <subset_file> <wordlist>
     Returns a list of (hash, cleartext) tuples that this mode cracked.
     """
     show_proc = subprocess.run(
-        ["hashcat", "-m", mode, "-a", "0", "--quiet", "--potfile-path", potpath, "--show", subset_file, wordlist],
+        ["hashcat", "-m", mode, "-a", "0", "--quiet", session_flag(f"{mode}_show"),
+         "--potfile-path", potpath, "--show", subset_file, wordlist],
         capture_output=True,
-        text=True
+        text=True,
+        errors="surrogateescape"
     )
     lines = show_proc.stdout.strip().splitlines()
     pairs = []
@@ -152,82 +569,316 @@ def extract_cracked_from_pot(mode, subset_file, wordlist, potpath):
             pairs.append((h, clear))
     return pairs
 
+def prepare_mode(mode_id, mode_name, pending, logged, devices=None):
+    """
+    Host-side half of one isolated crack attempt for <mode_id>: seed and read
+    the mode's potfile, then write whatever is still pending to a subset file.
+    <devices> yields --multi-gpu device numbers; one is only taken once a
+    subset file is written, i.e. when hashcat will actually start.
+    Returns a job dict for crack_mode(); job["subset_file"] is None when the
+    potfile already covered everything and hashcat doesn't need to start.
+    """
+    job = {
+        "mode_id": mode_id,
+        "mode_name": mode_name,
+        "skipped": False,
+        "known_pairs": [],
+        "subset_file": None,
+    }
+    if not pending:
+        job["skipped"] = True
+        return job
+
+    # 1) Reuse (and seed) the persistent potfile for this mode, and drop any
+    #    pending hash it already knows. If that covers everything, hashcat
+    #    never has to start.
+    potpath = mode_potfile(mode_id, logged)
+    pending, job["known_pairs"] = prefilter_with_pot(pending, potpath)
+    if not pending:
+        return job
+
+    # Keep identical salts (or at least lengths) contiguous for hashcat
+    pending.sort(key=SORT_KEYS_BY_MODE.get(mode_id, length_key))
+
+    # Write the still-pending hashes to a temporary subset file
+    tf = tempfile.NamedTemporaryFile(prefix="hc_subset_", delete=False, mode="w", errors="surrogateescape", buffering=1 << 20)
+    tf.write("\n".join(pending))
+    tf.write("\n")
+    tf.close()
+
+    job.update(
+        subset_file=tf.name,
+        potpath=potpath,
+        offset=os.path.getsize(potpath),
+        lookup=pot_lookup(pending),
+        device=next(devices) if devices else None,
+    )
+    return job
+
+def crack_mode(job, wordlist, cleanup_q, *, optimize=True, workload=3):
+    """
+    Hashcat half of a crack attempt prepared by prepare_mode(). Each job owns
+    its own subset file and per-mode potfile, so several can run at once.
+    The subset file is handed to the cleanup thread via <cleanup_q>.
+    Returns (mode_id, mode_name, pairs) including the job's known pairs;
+    pairs is empty if nothing cracked.
+    """
+    mode_id, mode_name = job["mode_id"], job["mode_name"]
+    subset_file, potpath = job["subset_file"], job["potpath"]
+
+    pairs = []
+    try:
+        # 2) Run hashcat on the subset
+        cracked = run_hashcat_with_pot(
+            mode_id, subset_file, wordlist, potpath, job["device"],
+            optimize=optimize, workload=workload
+        )
+
+        if cracked:
+            # 3) Extract exactly what this mode cracked
+            pairs, unmatched = read_cracked_from_pot(potpath, job["lookup"], job["offset"])
+            # Success with nothing new we can map means hashcat normalised a
+            # hash some other way or took it from the potfile: ask --show
+            if unmatched or not pairs:
+                pairs = extract_cracked_from_pot(mode_id, subset_file, wordlist, potpath)
+    finally:
+        # 4) Cleanup, off the critical path
+        cleanup_q.put(subset_file)
+
+    return mode_id, mode_name, job["known_pairs"] + pairs
+
+def prep_worker(candidates, all_hashes, all_hashes_set, cracked_by_mode, n_devices, prep_q, errors):
+    """
+    Background thread: prepare_mode() each candidate in turn and hand the jobs
+    to the main thread through <prep_q>. The queue is bounded, so this stays
+    only a step ahead of hashcat. Always finishes with a None sentinel; an
+    exception is stored in <errors> for the main thread to re-raise.
+    """
+    # Round-robin over devices 1..N, only for modes that launch hashcat
+    devices = cycle(range(1, n_devices + 1)) if n_devices else None
+    try:
+        for mode_id, mode_name in candidates:
+            # Build subset of pending hashes for this mode
+            logged = cracked_by_mode.get(mode_id, {})
+            pending_set = all_hashes_set - logged.keys()
+            pending = [h for h in all_hashes if h in pending_set]
+
+            prep_q.put(prepare_mode(mode_id, mode_name, pending, logged, devices))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        prep_q.put(None)
+
+def cleanup_worker(cleanup_q):
+    """
+    Background thread: remove finished subset files until a None sentinel.
+    """
+    for path in iter(cleanup_q.get, None):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def report_result(mode_id, mode_name, pairs, log_conn, cracked_summary):
+    """
+    Print one mode's outcome and log each cracked pair.
+    """
+    if not pairs:
+        print(f"→ Mode {mode_id:<6} ({mode_name}) … [NOT FOUND]")
+        return
+
+    # hashcat can report the same pair twice (e.g. potfile + fresh crack)
+    pairs = list(dict.fromkeys(pairs))
+
+    print(f"→ Mode {mode_id:<6} ({mode_name}) … [FOUND]")
+    # One timestamp per hashcat run is plenty
+    ts = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    for h, clear in pairs:
+        print(f"    {h} → '{clear}'")
+        # Log each newly cracked <hash, mode_id, clear, timestamp>
+        entry = {
+            "hash": h,
+            "mode_id": mode_id,
+            "clear": clear,
+            "timestamp": ts
+        }
+        append_log(log_conn, entry)
+    cracked_summary.append((mode_id, mode_name, pairs))
+
+def autodetect_attempt(hash_file, wordlist, all_hashes, cracked_by_mode, *, optimize=True, workload=3):
+    """
+    Try hashcat's native mode autodetection (see run_hashcat_autodetect).
+    The attack runs against a staging potfile, since the mode isn't known up
+    front; whatever it cracks is then merged into that mode's persistent one.
+    The staging potfile is seeded with every logged pair (any mode), so
+    hashcat only spends time on hashes that aren't cracked yet.
+    If hashcat attacked but its output didn't say which mode, `--show` is
+    asked; a single candidate there settles it.
+    Returns (modes, result): result is (mode_id, mode_name, pairs) if hashcat
+    ran the attack itself, else None.
+    """
+    tmp_pot = tempfile.NamedTemporaryFile(prefix="hc_pot_", delete=False, mode="w", errors="surrogateescape")
+    for logged in cracked_by_mode.values():
+        for h, clear in logged.items():
+            tmp_pot.write(f"{h}:{clear}\n")
+    tmp_pot_path = tmp_pot.name
+    tmp_pot.close()
+    offset = os.path.getsize(tmp_pot_path)
+
+    modes, attacked_mode, ran = run_hashcat_autodetect(
+        hash_file, wordlist, tmp_pot_path, optimize=optimize, workload=workload
+    )
+    cracked_something = os.path.getsize(tmp_pot_path) > offset
+
+    if attacked_mode is None and (ran or cracked_something):
+        modes = get_candidate_modes(hash_file)
+        if len(modes) == 1:
+            attacked_mode = modes[0]
+
+    if attacked_mode is None:
+        if cracked_something:
+            # Never throw away cracks: keep them where the user can find them
+            os.makedirs(POT_DIR, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            kept = os.path.join(POT_DIR, f"autodetect-unknown-mode-{stamp}.pot")
+            os.replace(tmp_pot_path, kept)
+            print(f"Warning: hashcat cracked hashes but didn't say which mode; kept them in {kept}")
+        else:
+            os.remove(tmp_pot_path)
+        return modes, None
+
+    mode_id, mode_name = attacked_mode
+    try:
+        pairs, unmatched = read_cracked_from_pot(tmp_pot_path, pot_lookup(all_hashes), offset)
+        if unmatched:
+            pairs = extract_cracked_from_pot(mode_id, hash_file, wordlist, tmp_pot_path)
+    finally:
+        try:
+            os.remove(tmp_pot_path)
+        except OSError:
+            pass
+
+    logged = cracked_by_mode.get(mode_id, {})
+    mode_potfile(mode_id, {**logged, **dict(pairs)})
+    pairs = [(h, clear) for h, clear in pairs if h not in logged]
+    return modes, (mode_id, mode_name, pairs)
+
 def main():
-    hash_file, wordlist = validate_args()
+    args = validate_args()
+    # Hashes that aren't valid UTF-8 carry surrogates; print them escaped
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(errors="backslashreplace")
+    hash_file, wordlist = args.hash_file, args.wordlist
 
     # Load existing log
-    already_cracked, log_entries = load_log_entries()
+    log_conn = open_log()
+    cracked_by_mode = load_log_entries(log_conn)
+
+    # Read all hashes once
+    all_hashes, all_hashes_set = get_all_hashes(hash_file)
+
+    candidates = []
+    autodetected = None
+    if args.auto_detect:
+        logged_hashes = set().union(*cracked_by_mode.values())
+        if all_hashes_set <= logged_hashes:
+            print(f"→ Every hash in {hash_file} is already in {LOG_FILE}; nothing for hashcat to autodetect.")
+            sys.exit(0)
+
+        version = get_hashcat_version()
+        if version >= AUTODETECT_MIN_VERSION:
+            print(f"→ Letting hashcat autodetect the mode for {hash_file} …")
+            candidates, autodetected = autodetect_attempt(
+                hash_file, wordlist, all_hashes, cracked_by_mode,
+                optimize=args.optimize, workload=args.workload
+            )
+        else:
+            shown = ".".join(map(str, version)) or "unknown"
+            print(f"→ hashcat {shown} has no mode autodetection, falling back to --show …")
 
-    print(f"→ Enumerating possible modes with `hashcat --show {hash_file}` …")
-    candidates = get_candidate_modes(hash_file)
+    if not candidates:
+        print(f"→ Enumerating possible modes with `hashcat --show {hash_file}` …")
+        candidates = get_candidate_modes(hash_file)
 
     if not candidates:
         print("No candidate modes found. Either your hash_file is invalid or Hashcat's output format changed.")
         sys.exit(1)
 
-    # Read all hashes once
-    all_hashes = get_all_hashes(hash_file)
-
     print(f"→ Found {len(candidates)} candidate mode(s):")
     for mode_id, mode_name in candidates:
         print(f"   • {mode_id}  ({mode_name})")
 
     cracked_summary = []  # list of (mode_id, mode_name, [(hash, clear), ...])
 
-    print("\n→ Starting isolated crack attempts, one subset per mode …\n")
-
-    for mode_id, mode_name in candidates:
-        # Build subset of pending hashes for this mode
-        pending = [h for h in all_hashes if (h, mode_id) not in already_cracked]
-        if not pending:
-            print(f"→ Mode {mode_id:<6} ({mode_name}) … [SKIPPED] no new hashes for this mode. delete crack_log.json if you wish to still run this mode ig??")
-            continue
-
-        print(f"→ Mode {mode_id:<6} ({mode_name}) … ", end="", flush=True)
-
-        # Write pending hashes to a temporary subset file
-        tf = tempfile.NamedTemporaryFile(prefix="hc_subset_", delete=False, mode="w")
-        for h in pending:
-            tf.write(h + "\n")
-        tf.flush()
-        tf.close()
-        subset_file = tf.name
-
-        # 1) Create a unique temp potfile for this mode
-        tmp_pot = tempfile.NamedTemporaryFile(prefix="hc_pot_", delete=False)
-        tmp_pot_path = tmp_pot.name
-        tmp_pot.close()
-
-        # 2) Run hashcat on the subset
-        cracked = run_hashcat_with_pot(mode_id, subset_file, wordlist, tmp_pot_path)
-
-        if cracked:
-            # 3) Extract exactly what this mode cracked
-            pairs = extract_cracked_from_pot(mode_id, subset_file, wordlist, tmp_pot_path)
-            print("[FOUND]")
-            for h, clear in pairs:
-                print(f"    {h} → '{clear}'")
-                # Log each newly cracked <hash, mode_id, clear, timestamp>
-                entry = {
-                    "hash": h,
-                    "mode_id": mode_id,
-                    "clear": clear,
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                }
-                append_log(log_entries, entry)
-                cracked_summary.append((mode_id, mode_name, pairs))
-        else:
-            print("[NOT FOUND]")
-
-        # 4) Cleanup
-        try:
-            os.remove(tmp_pot_path)
-        except OSError:
-            pass
-        try:
-            os.remove(subset_file)
-        except OSError:
-            pass
+    if autodetected:
+        # Single match: hashcat already ran the attack, nothing left to schedule
+        print("\n→ hashcat ran the attack itself (only one mode matched) …\n")
+        report_result(*autodetected, log_conn, cracked_summary)
+        candidates = []
+    else:
+        print(f"\n→ Starting isolated crack attempts, one subset per mode ({args.jobs} at a time) …\n")
+
+    capped = [MODE_MAX_LEN_OPTIMIZED[m] for m, _ in candidates if m in MODE_MAX_LEN_OPTIMIZED]
+    if args.optimize and capped:
+        # Not worth a hashcat launch if no word fits the optimized kernel.
+        # Once a word fits even the tightest cap, nothing can be skipped.
+        wl_min = wordlist_min_len(wordlist, stop_at=min(capped))
+        runnable = []
+        for mode_id, mode_name in candidates:
+            max_len = MODE_MAX_LEN_OPTIMIZED.get(mode_id)
+            if max_len is not None and wl_min > max_len:
+                print(f"→ Mode {mode_id:<6} ({mode_name}) … [SKIPPED] every word is longer than {max_len} chars, the -O limit for this mode. try --no-optimize")
+                continue
+            runnable.append((mode_id, mode_name))
+        candidates = runnable
+
+    # Pipeline: a prep thread writes the next subset file(s) while hashcat is
+    # busy, and a cleanup thread deletes finished ones.
+    prep_q = queue.Queue(maxsize=1)
+    cleanup_q = queue.Queue()
+    prep_errors = []
+    prep_thread = threading.Thread(
+        target=prep_worker,
+        args=(candidates, all_hashes, all_hashes_set, cracked_by_mode, args.multi_gpu, prep_q, prep_errors),
+        daemon=True
+    )
+    cleanup_thread = threading.Thread(target=cleanup_worker, args=(cleanup_q,), daemon=True)
+    prep_thread.start()
+    cleanup_thread.start()
+
+    # Results are printed/logged from this thread only, so the sqlite
+    # connection is never shared across threads
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        running = set()
+        for job in iter(prep_q.get, None):
+            if job["skipped"]:
+                print(f"→ Mode {job['mode_id']:<6} ({job['mode_name']}) … [SKIPPED] no new hashes for this mode. delete crack_log.db if you wish to still run this mode ig??")
+                continue
+            if job["subset_file"] is None:
+                report_result(job["mode_id"], job["mode_name"], job["known_pairs"], log_conn, cracked_summary)
+                continue
+
+            # Only pull the next prepared job once a hashcat slot is free
+            while len(running) >= args.jobs:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report_result(*future.result(), log_conn, cracked_summary)
+
+            running.add(pool.submit(
+                crack_mode, job, wordlist, cleanup_q,
+                optimize=args.optimize, workload=args.workload
+            ))
+
+        for future in as_completed(running):
+            report_result(*future.result(), log_conn, cracked_summary)
+
+    prep_thread.join()
+    cleanup_q.put(None)
+    cleanup_thread.join()
+    if prep_errors:
+        raise prep_errors[0]
+
+    log_conn.close()
 
     # Final summary
     print("\n=== Summary of All Modes That Actually Cracked Something ===")
@@ -236,7 +887,6 @@ def main():
         sys.exit(0)
 
     for mode_id, mode_name, pairs in cracked_summary:
-        # Note: pairs may repeat across modes, but we only log newly cracked ones above.
         print(f"\n→ Mode {mode_id} ({mode_name}) cracked {len(pairs)} hash(es):")
         for h, clear in pairs:
             print(f"    {h} → '{clear}'")